@@ -0,0 +1,46 @@
+"""Video and detection helpers shared by aruco_detector.py and aruco_validator.py."""
+
+import os
+
+import cv2
+
+# FFmpeg capture options and OpenCV acceleration type for each --hwaccel choice
+HWACCEL_OPTIONS = {
+    'cuda': ('hwaccel;cuda', cv2.VIDEO_ACCELERATION_ANY),
+    'vaapi': ('hwaccel;vaapi', cv2.VIDEO_ACCELERATION_VAAPI),
+    'videotoolbox': ('hwaccel;videotoolbox', cv2.VIDEO_ACCELERATION_ANY),
+}
+
+def open_video(path, hwaccel='none'):
+    """Open a video file, decoding on the GPU through FFmpeg when hwaccel is requested."""
+    path = str(path)
+    if hwaccel == 'none':
+        return cv2.VideoCapture(path)
+
+    # FFmpeg reads the options when the capture opens; an existing setting wins
+    capture_options, acceleration = HWACCEL_OPTIONS[hwaccel]
+    user_options = os.environ.get('OPENCV_FFMPEG_CAPTURE_OPTIONS')
+    if user_options is None:
+        os.environ['OPENCV_FFMPEG_CAPTURE_OPTIONS'] = capture_options
+    try:
+        cap = cv2.VideoCapture(path, cv2.CAP_FFMPEG, [cv2.CAP_PROP_HW_ACCELERATION, acceleration])
+    finally:
+        # Don't leak the options into captures opened later in the process
+        if user_options is None:
+            del os.environ['OPENCV_FFMPEG_CAPTURE_OPTIONS']
+    if cap.isOpened():
+        return cap
+
+    # Decoded frames are CPU images either way, so software decoding is a safe fallback
+    print(f"Warning: {hwaccel} decoding unavailable, falling back to software decoding")
+    return cv2.VideoCapture(path)
+
+def download_detections(corners, ids, rejected):
+    """Convert detector outputs to NumPy; OpenCV returns UMats for UMat input."""
+    if not isinstance(ids, cv2.UMat):
+        return corners, ids, rejected
+
+    ids = ids.get() if corners else None
+    corners = tuple(corner.get() for corner in corners)
+    rejected = tuple(candidate.get() for candidate in rejected)
+    return corners, ids, rejected
@@ -4,27 +4,80 @@ import cv2
 import numpy as np
 import argparse
 from cv2 import aruco
+from concurrent.futures import ThreadPoolExecutor
+from aruco_common import HWACCEL_OPTIONS, download_detections, open_video
+import functools
+import itertools
+import os
+import queue
+import signal
 import sys
+import threading
 
-def get_dictionary_info(dict_name):
-    """Extract marker size and number from dictionary name."""
-    # Special case for DICT_ARUCO_ORIGINAL
-    if dict_name == 'DICT_ARUCO_ORIGINAL':
-        return 6, 1024  # Original ArUco markers are 6x6
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; the NumPy fallback is used instead
+    njit = None
 
-    # Format is DICT_<SIZE>X<SIZE>_<COUNT>
-    parts = dict_name.split('_')
-    size = int(parts[1][0])  # Extract size (4,5,6,7)
-    count = int(parts[2])    # Extract count (50,100,250,etc)
-    return size, count
+# Available ArUco dictionaries
+ARUCO_DICTS = {
+    'DICT_4X4_50': aruco.DICT_4X4_50,
+    'DICT_4X4_100': aruco.DICT_4X4_100,
+    'DICT_4X4_250': aruco.DICT_4X4_250,
+    'DICT_4X4_1000': aruco.DICT_4X4_1000,
+    'DICT_5X5_50': aruco.DICT_5X5_50,
+    'DICT_5X5_100': aruco.DICT_5X5_100,
+    'DICT_5X5_250': aruco.DICT_5X5_250,
+    'DICT_5X5_1000': aruco.DICT_5X5_1000,
+    'DICT_6X6_50': aruco.DICT_6X6_50,
+    'DICT_6X6_100': aruco.DICT_6X6_100,
+    'DICT_6X6_250': aruco.DICT_6X6_250,
+    'DICT_6X6_1000': aruco.DICT_6X6_1000,
+    'DICT_7X7_50': aruco.DICT_7X7_50,
+    'DICT_7X7_100': aruco.DICT_7X7_100,
+    'DICT_7X7_250': aruco.DICT_7X7_250,
+    'DICT_7X7_1000': aruco.DICT_7X7_1000,
+    'DICT_ARUCO_ORIGINAL': aruco.DICT_ARUCO_ORIGINAL,
+}
+
+# Frames buffered between pipeline stages before the producer blocks
+PIPELINE_QUEUE_SIZE = 4
+
+# Side-by-side views alive at once: the queued ones, the one on screen and
+# the one being drawn
+SIDE_BY_SIDE_BUFFER_COUNT = PIPELINE_QUEUE_SIZE + 2
+
+# Frames are compared on thumbnails of this size to skip work on a static scene;
+# it counts as static while at most STATIC_MAX_CHANGED_PIXELS thumbnail pixels
+# differ by more than STATIC_DIFF_THRESHOLD gray levels
+STATIC_THUMBNAIL_SIZE = (160, 90)
+STATIC_DIFF_THRESHOLD = 15
+STATIC_MAX_CHANGED_PIXELS = 16
+
+# Sub-pixel search window and stop criteria for refining downscaled detections
+CORNER_REFINE_WINDOW = (5, 5)
+CORNER_REFINE_CRITERIA = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_COUNT, 30, 0.01)
+
+# Detection count from which the NumPy duplicate filter uses a grid hash
+DUPLICATE_GRID_MIN_COUNT = 64
+
+# Detections whose centers are closer than this many full resolution pixels
+# count as duplicates of the same marker
+DUPLICATE_MIN_DISTANCE = 20
+
+# While views back up, the GUI is only pumped once per this many frames
+KEY_POLL_INTERVAL = 10
+
+# Frames at least this tall are searched for markers at half resolution
+PYRAMID_MIN_HEIGHT = 720
 
 def add_debug_overlay(frame, text_lines, start_y=30, line_height=30):
     """Add debug information as overlay on the frame."""
-    # Add semi-transparent black background for better text visibility
-    overlay = frame.copy()
+    # Add semi-transparent black background for better text visibility.
+    # Blending black at 50% is just halving the pixels, so only touch the box
     bg_height = (len(text_lines) + 1) * line_height
-    cv2.rectangle(overlay, (10, 10), (400, 10 + bg_height), (0, 0, 0), -1)
-    cv2.addWeighted(overlay, 0.5, frame, 0.5, 0, frame)
+    background = frame[10:11 + bg_height, 10:401]
+    np.right_shift(background, 1, out=background)
 
     # Add text lines
     for i, (text, color) in enumerate(text_lines):
@@ -44,24 +97,38 @@ def get_debug_color(dict_index):
     ]
     return colors[dict_index % len(colors)]
 
-def create_debug_visualization(frame, corners, ids, rejected, dict_name, dict_index):
-    """Create debug visualization for a single dictionary detection."""
-    debug_frame = frame.copy()
+def draw_markers(image, corners, ids=None, color=(0, 255, 0)):
+    """Draw marker outlines and ID labels, all outlines in a single polylines call."""
+    if len(corners) == 0:
+        return image
     
-    # Convert to grayscale - this is what the detector actually processes
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    # (N, 4, 2) integer corners for every marker
+    points = np.rint(np.concatenate([corner.reshape(1, 4, 2) for corner in corners])).astype(np.int32)
+    cv2.polylines(image, list(points), True, color, 1)
     
-    # Convert grayscale back to BGR for visualization
-    gray_bgr = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+    if ids is not None:
+        centers = points.mean(axis=1).astype(np.int32).tolist()
+        for (center_x, center_y), marker_id in zip(centers, ids.ravel().tolist()):
+            cv2.putText(image, f"id={marker_id}", (center_x, center_y),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+    
+    return image
+
+def create_debug_visualization(frame, gray_bgr, corners, ids, rejected, dict_name, dict_index):
+    """Create debug visualization for a single dictionary detection.
+    
+    gray_bgr is the detector's grayscale input converted to BGR once per frame.
+    """
+    debug_frame = frame.copy()
     
     # Draw detected markers with unique color
     color = get_debug_color(dict_index)
     if ids is not None:
-        debug_frame = aruco.drawDetectedMarkers(debug_frame, corners, ids, color)
+        debug_frame = draw_markers(debug_frame, corners, ids, color)
     
     # Draw rejected candidates in red
     if rejected is not None and len(rejected) > 0:
-        debug_frame = aruco.drawDetectedMarkers(debug_frame, rejected, None, (0, 0, 255))
+        debug_frame = draw_markers(debug_frame, rejected, None, (0, 0, 255))
     
     # Add dictionary name
     cv2.putText(debug_frame, dict_name, (10, 30),
@@ -69,42 +136,126 @@ def create_debug_visualization(frame, corners, ids, rejected, dict_name, dict_in
     
     return debug_frame, gray_bgr
 
+def _keep_in_index_order(neighbours, bounds, perimeters):
+    """Resolve duplicates like a pairwise loop over detections in index order.
+    
+    neighbours[bounds[i]:bounds[i + 1]] lists, ascending, the later detections
+    close to detection i. Each kept detection drops the smaller ones among them
+    until it meets one at least as large, which drops it instead.
+    """
+    keep = np.ones(len(perimeters), dtype=np.bool_)
+    for i in range(len(perimeters)):
+        if not keep[i]:
+            continue
+        close = neighbours[bounds[i]:bounds[i + 1]]
+        close = close[keep[close]]
+        larger = perimeters[close] >= perimeters[i]
+        if larger.any():
+            keep[close[:larger.argmax()]] = False
+            keep[i] = False
+        else:
+            keep[close] = False
+    
+    return keep
+
+def _resolve_duplicates_grid(centers, perimeters, min_distance_sq):
+    """Same as _resolve_duplicates_numpy, comparing only centers in neighbouring grid cells."""
+    count = len(centers)
+    
+    # Bucket centers into cells one min_distance wide and give each cell an
+    # integer key, so the cell one step left/right/up/down is key -/+ span/1
+    cells = np.floor(centers / np.sqrt(min_distance_sq)).astype(np.int64)
+    rows = cells[:, 1] - cells[:, 1].min() + 1
+    span = rows.max() + 2
+    keys = cells[:, 0] * span + rows
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    
+    # Candidate pairs are all detections in the 3x3 block of cells around each one
+    firsts = []
+    seconds = []
+    for column_offset in (-span, 0, span):
+        low = np.searchsorted(sorted_keys, keys + column_offset - 1, 'left')
+        high = np.searchsorted(sorted_keys, keys + column_offset + 1, 'right')
+        counts = high - low
+        starts = np.repeat(low - (np.cumsum(counts) - counts), counts)
+        firsts.append(np.repeat(np.arange(count), counts))
+        seconds.append(order[starts + np.arange(counts.sum())])
+    first = np.concatenate(firsts)
+    second = np.concatenate(seconds)
+    
+    deltas = centers[first] - centers[second]
+    close = ((deltas ** 2).sum(axis=-1) < min_distance_sq) & (first < second)
+    first = first[close]
+    second = second[close]
+    
+    # Order the close pairs by first, then second detection
+    by_pair = np.lexsort((second, first))
+    bounds = np.searchsorted(first[by_pair], np.arange(count + 1))
+    return _keep_in_index_order(second[by_pair], bounds, perimeters)
+
+def _resolve_duplicates_numpy(centers, perimeters, min_distance_sq):
+    """Return a keep mask over detections, dropping the smaller of each too close pair.
+    
+    Pairs are resolved in index order, as the original pairwise loop did.
+    """
+    # The dense distance matrix grows quadratically; hash into a grid instead
+    if len(centers) >= DUPLICATE_GRID_MIN_COUNT:
+        return _resolve_duplicates_grid(centers, perimeters, min_distance_sq)
+    
+    # Close pairs (i, j) with i < j from the pairwise squared distances, ordered by i then j
+    deltas = centers[:, None, :] - centers[None, :, :]
+    too_close = np.triu((deltas ** 2).sum(axis=-1) < min_distance_sq, 1)
+    first, second = np.nonzero(too_close)
+    bounds = np.searchsorted(first, np.arange(len(centers) + 1))
+    return _keep_in_index_order(second, bounds, perimeters)
+
+def _resolve_duplicates_loop(centers, perimeters, min_distance_sq):
+    """Same as _resolve_duplicates_numpy, written as plain loops for Numba."""
+    count = centers.shape[0]
+    keep = np.ones(count, dtype=np.bool_)
+    
+    for i in range(count):
+        if not keep[i]:
+            continue
+        for j in range(i + 1, count):
+            if keep[j]:
+                dx = centers[i, 0] - centers[j, 0]
+                dy = centers[i, 1] - centers[j, 1]
+                if dx * dx + dy * dy < min_distance_sq:
+                    # Keep the one with the larger perimeter (likely more accurate)
+                    if perimeters[i] > perimeters[j]:
+                        keep[j] = False
+                    else:
+                        keep[i] = False
+                        break
+    
+    return keep
+
+if njit is not None:
+    _resolve_duplicates = njit(cache=True, nogil=True)(_resolve_duplicates_loop)
+else:
+    _resolve_duplicates = _resolve_duplicates_numpy
+
+# Index of the next corner around a quad, closing back to the first
+_NEXT_CORNER = np.array([1, 2, 3, 0])
+
 def filter_duplicate_detections(corners, ids, min_distance=10):
     """Filter out duplicate marker detections that are too close to each other."""
     if ids is None or len(ids) == 0:
         return corners, ids
     
-    # Convert corners to centers
-    centers = []
-    for corner in corners:
-        center = np.mean(corner[0], axis=0)
-        centers.append(center)
-    centers = np.array(centers)
+    # Stack corners once as (N, 4, 2), then get all centers and closed-quad
+    # perimeters in single array operations
+    quads = np.concatenate(corners).astype(np.float32, copy=False)
+    centers = quads.mean(axis=1)
+    edges = quads[:, _NEXT_CORNER] - quads
+    perimeters = np.sqrt((edges ** 2).sum(axis=-1)).sum(axis=1, dtype=np.float64)
     
-    # Keep track of which detections to keep
-    keep = np.ones(len(ids), dtype=bool)
+    keep = _resolve_duplicates(centers, perimeters, np.float32(min_distance * min_distance))
     
-    # Compare each detection with all others
-    for i in range(len(ids)):
-        if not keep[i]:
-            continue
-        for j in range(i + 1, len(ids)):
-            if not keep[j]:
-                continue
-            # Calculate distance between centers
-            dist = np.linalg.norm(centers[i] - centers[j])
-            if dist < min_distance:
-                # Keep the one with larger perimeter (likely more accurate)
-                perimeter1 = cv2.arcLength(corners[i][0], True)
-                perimeter2 = cv2.arcLength(corners[j][0], True)
-                if perimeter1 > perimeter2:
-                    keep[j] = False
-                else:
-                    keep[i] = False
-                    break
-    
-    # Filter corners and ids
-    filtered_corners = [corners[i] for i in range(len(corners)) if keep[i]]
+    # Filter corners and ids with the same mask; compress walks it in C
+    filtered_corners = list(itertools.compress(corners, keep.tolist()))
     filtered_ids = ids[keep]
     
     return filtered_corners, filtered_ids
@@ -145,103 +296,288 @@ def calculate_detection_parameters(frame_width, frame_height):
     
     return parameters
 
-def detect_markers_with_params(frame, aruco_dict, parameters=None):
-    """Detect markers using OpenCV's ArUco detector."""
+def create_fast_detection_parameters():
+    """Create detector parameters using the faster Aruco3 candidate search."""
+    parameters = aruco.DetectorParameters()
+    
+    # Search for candidates on a downscaled image sized for the smallest marker
+    parameters.useAruco3Detection = True
+    parameters.minSideLengthCanonicalImg = 32
+    parameters.minMarkerLengthRatioOriginalImg = 0.05
+    
+    # Skip corner refinement, this is only used for detection
+    parameters.cornerRefinementMethod = aruco.CORNER_REFINE_NONE
+    
+    return parameters
+
+# Shared detector parameters, built once at import
+TUNED_PARAMS = create_fast_detection_parameters()
+
+@functools.lru_cache(maxsize=32)
+def _get_detector(dict_const):
+    """Return the shared TUNED_PARAMS detector for a predefined dictionary constant."""
+    return aruco.ArucoDetector(aruco.getPredefinedDictionary(dict_const), TUNED_PARAMS)
+
+def create_detectors(dictionaries, parameters=None):
+    """Build one ArUco detector per dictionary, to be reused across frames."""
     if parameters is None:
-        parameters = aruco.DetectorParameters()
+        # Default detectors are cached, so repeated or runtime-added dictionaries are free
+        return {dict_name: _get_detector(aruco_dict) for dict_name, aruco_dict in dictionaries.items()}
     
-    # Convert to grayscale
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    detectors = {}
+    for dict_name, aruco_dict in dictionaries.items():
+        dictionary = aruco.getPredefinedDictionary(aruco_dict)
+        detectors[dict_name] = aruco.ArucoDetector(dictionary, parameters)
     
-    # Create detector with minimal parameter tuning
-    detector = aruco.ArucoDetector(aruco_dict, parameters)
+    return detectors
+
+# Dictionary groups keyed by the dictionary names they were built from
+_DICTIONARY_GROUPS = {}
+
+def get_dictionary_groups(detectors):
+    """Group dictionaries that one identification pass can answer for, built once per dictionary set.
+    
+    Predefined dictionaries of one marker size share their leading codes, so when
+    they also share the error correction budget, identifying against the largest
+    one and keeping ids below a smaller one's marker count gives exactly the
+    smaller one's result. Returns (representatives, members) where representatives
+    lists one dictionary name per group and members maps every dictionary name
+    to (group_index, marker_count).
+    """
+    key = tuple(detectors)
+    if key not in _DICTIONARY_GROUPS:
+        dictionaries = {dict_name: detector.getDictionary() for dict_name, detector in detectors.items()}
+        
+        # Visit the largest dictionaries first so each group starts with its superset
+        representatives = []
+        members = {}
+        for dict_name in sorted(dictionaries, key=lambda name: -len(dictionaries[name].bytesList)):
+            dictionary = dictionaries[dict_name]
+            marker_count = len(dictionary.bytesList)
+            for group_index, representative_name in enumerate(representatives):
+                representative = dictionaries[representative_name]
+                if (representative.markerSize == dictionary.markerSize
+                        and representative.maxCorrectionBits == dictionary.maxCorrectionBits
+                        and np.array_equal(representative.bytesList[:marker_count], dictionary.bytesList)):
+                    members[dict_name] = (group_index, marker_count)
+                    break
+            else:
+                members[dict_name] = (len(representatives), marker_count)
+                representatives.append(dict_name)
+        _DICTIONARY_GROUPS[key] = (representatives, members)
+    return _DICTIONARY_GROUPS[key]
+
+def create_multi_dictionary_detector(detectors, parameters=None):
+    """Build a single detector covering all dictionaries, if OpenCV supports it."""
+    # Multi-dictionary detection was added in OpenCV 4.11
+    if not hasattr(aruco.ArucoDetector, 'detectMarkersMultiDict'):
+        return None
+    
+    if parameters is None:
+        parameters = TUNED_PARAMS
     
+    # Only one dictionary per group needs identifying
+    representatives, _ = get_dictionary_groups(detectors)
+    dictionaries = [detectors[dict_name].getDictionary() for dict_name in representatives]
+    return aruco.ArucoDetector(dictionaries, parameters)
+
+def detect_markers_with_params(gray, detector, min_distance=DUPLICATE_MIN_DISTANCE):
+    """Detect markers in a grayscale frame using a prebuilt OpenCV ArUco detector.
+    
+    min_distance is in gray's pixels, so pass a smaller one for a downscaled frame.
+    """
     # Detect markers
-    corners, ids, rejected = detector.detectMarkers(gray)
+    corners, ids, rejected = download_detections(*detector.detectMarkers(gray))
     
     # Filter out duplicate detections if any markers were found
     if corners and ids is not None:
-        corners, ids = filter_duplicate_detections(corners, ids, min_distance=20)
+        corners, ids = filter_duplicate_detections(corners, ids, min_distance)
     
     return corners, ids, rejected
 
-def test_all_dictionaries(frame, dictionaries):
-    """Test all dictionaries and return results for each."""
-    results = []
+@functools.lru_cache(maxsize=None)
+def get_detection_pool():
+    """Return the shared thread pool for running per-dictionary detectors in parallel."""
+    return ThreadPoolExecutor(max_workers=os.cpu_count())
+
+def run_detectors(gray, detectors, min_distance=DUPLICATE_MIN_DISTANCE):
+    """Run every detector on gray, yielding (corners, ids, rejected) in dictionary order.
+    
+    On one core the passes run lazily, so callers can stop at the first hit.
+    """
+    if os.cpu_count() == 1:
+        return (detect_markers_with_params(gray, detector, min_distance) for detector in detectors.values())
+    
+    # A UMat should not be shared between threads' OpenCL queues
+    if isinstance(gray, cv2.UMat):
+        gray = gray.get()
+    
+    # detectMarkers releases the GIL, so run the passes side by side
+    return get_detection_pool().map(
+        lambda detector: detect_markers_with_params(gray, detector, min_distance), detectors.values())
+
+def detect_markers_all_dictionaries(gray, detectors, multi_detector=None, min_distance=DUPLICATE_MIN_DISTANCE):
+    """Detect markers for every dictionary, returning {dict_name: (corners, ids, rejected)}."""
+    if multi_detector is None:
+        # Older OpenCV: every dictionary needs its own full pass
+        return dict(zip(detectors, run_detectors(gray, detectors, min_distance)))
+    
+    # Candidate extraction runs once; only bit identification is per dictionary
+    corners, ids, rejected, dict_indices = multi_detector.detectMarkersMultiDict(gray)
+    if isinstance(dict_indices, cv2.UMat):
+        dict_indices = dict_indices.get() if corners else None
+    corners, ids, rejected = download_detections(corners, ids, rejected)
+    if ids is not None:
+        dict_indices = dict_indices.ravel()
+        flat_ids = ids.ravel()
+    
+    _, members = get_dictionary_groups(detectors)
+    results = {}
+    for dict_name in detectors:
+        # Bucket the detections of this dictionary's group that fall inside it
+        group_index, marker_count = members[dict_name]
+        selected = (np.flatnonzero((dict_indices == group_index) & (flat_ids < marker_count))
+                    if ids is not None else ())
+        if len(selected) == 0:
+            results[dict_name] = ((), None, rejected)
+            continue
+        
+        dict_corners = [corners[j] for j in selected]
+        dict_corners, dict_ids = filter_duplicate_detections(
+            dict_corners, ids[selected], min_distance)
+        results[dict_name] = (dict_corners, dict_ids, rejected)
+    
+    return results
+
+def visualize_all_dictionaries(frame, gray, detections):
+    """Build one debug frame and one grayscale frame per dictionary from detect_markers_all_dictionaries output."""
     debug_frames = []
     thresh_frames = []
     
-    for i, (dict_name, aruco_dict) in enumerate(dictionaries.items()):
-        # Get marker size and count from dictionary name
-        marker_size, marker_count = get_dictionary_info(dict_name)
-        # Create the dictionary
-        dictionary = aruco.Dictionary(aruco_dict, marker_size)
-        # Detect markers with tuned parameters
-        corners, ids, rejected = detect_markers_with_params(frame, dictionary)
-        
+    # The grayscale view is the same for every dictionary, so convert it once
+    gray_bgr = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+    
+    for i, (dict_name, (corners, ids, rejected)) in enumerate(detections.items()):
         # Create debug visualization
         debug_frame, thresh_frame = create_debug_visualization(
-            frame, corners, ids, rejected, dict_name, i)
+            frame, gray_bgr, corners, ids, rejected, dict_name, i)
         debug_frames.append(debug_frame)
         thresh_frames.append(thresh_frame)
-        
-        if ids is not None and len(ids) > 0:
-            results.append((dict_name, corners, ids))
     
+    return debug_frames, thresh_frames
+
+def test_all_dictionaries(frame, gray, detectors, multi_detector=None):
+    """Test all dictionaries and return results for each, with their debug frames.
+    
+    Callers that only need the results should use detect_markers_all_dictionaries.
+    """
+    detections = detect_markers_all_dictionaries(gray, detectors, multi_detector)
+    results = [(dict_name, corners, ids) for dict_name, (corners, ids, rejected) in detections.items()
+               if ids is not None and len(ids) > 0]
+    
+    debug_frames, thresh_frames = visualize_all_dictionaries(frame, gray, detections)
     return results, debug_frames, thresh_frames
 
-def find_first_marker(frame, dictionaries):
+def find_first_marker(gray, detectors, multi_detector=None, min_distance=DUPLICATE_MIN_DISTANCE):
     """Find first dictionary that detects any marker."""
-    for dict_name, aruco_dict in dictionaries.items():
-        # Get marker size and count from dictionary name
-        marker_size, marker_count = get_dictionary_info(dict_name)
-        # Create the dictionary
-        dictionary = aruco.Dictionary(aruco_dict, marker_size)
-        # Detect markers with tuned parameters
-        corners, ids, rejected = detect_markers_with_params(frame, dictionary)
-        
+    if multi_detector is not None:
+        # A single fused pass already covers every dictionary
+        detections = detect_markers_all_dictionaries(gray, detectors, multi_detector, min_distance)
+        for dict_name, (corners, ids, rejected) in detections.items():
+            if ids is not None and len(ids) > 0:
+                return corners, ids, dict_name, detectors[dict_name].getDictionary()
+        return None, None, None, None
+    
+    # Every dictionary needs a full pass; keep the first hit in dictionary order
+    for (dict_name, detector), (corners, ids, rejected) in zip(detectors.items(), run_detectors(gray, detectors, min_distance)):
         if ids is not None and len(ids) > 0:
-            return corners, ids, dict_name, dictionary
+            return corners, ids, dict_name, detector.getDictionary()
     
     return None, None, None, None
 
-def create_side_by_side_view(frame, corners, ids, dict_name, all_results=None):
-    """Create a side by side view of original frame and grayscale."""
-    # Get frame dimensions
-    height, width = frame.shape[:2]
+# Side-by-side view buffers, recycled once SIDE_BY_SIDE_BUFFER_COUNT are in use
+_SIDE_BY_SIDE_BUFFERS = []
+
+def get_side_by_side_buffer(height, width):
+    """Return the least recently used (height, 2 * width, 3) view buffer."""
+    shape = (height, width * 2, 3)
+    buffers = _SIDE_BY_SIDE_BUFFERS
+    if buffers and buffers[0].shape != shape:
+        buffers.clear()
+    
+    if len(buffers) < SIDE_BY_SIDE_BUFFER_COUNT:
+        buffers.append(np.empty(shape, dtype=np.uint8))
+    else:
+        buffers.append(buffers.pop(0))
+    return buffers[-1]
+
+@functools.lru_cache(maxsize=4)
+def get_static_labels(width, height):
+    """Pre-render the side-by-side view's fixed labels for one frame size.
+    
+    Returns [(rows, cols, image, mask)] patches. Labels are drawn without
+    anti-aliasing, so a masked copy of a patch matches putText exactly.
+    """
+    labels = [
+        ("Original + Detections", (10, 30), 1, (0, 255, 0)),
+        ("Grayscale View", (width + 10, 30), 1, (0, 255, 0)),
+        (f"Frame Resolution: {width}x{height}", (10, height - 30), 0.7, (255, 255, 255)),
+    ]
     
-    # Add resolution information to debug overlay
-    resolution_text = f"Frame Resolution: {width}x{height}"
+    patches = []
+    for text, origin, scale, color in labels:
+        # Render on a full-size canvas so clipping at the edges matches too
+        canvas = np.zeros((height, width * 2), dtype=np.uint8)
+        cv2.putText(canvas, text, origin, cv2.FONT_HERSHEY_SIMPLEX, scale, 255, 2)
+        x, y, w, h = cv2.boundingRect(canvas)
+        if w == 0 or h == 0:
+            continue
+        
+        rows, cols = slice(y, y + h), slice(x, x + w)
+        mask = canvas[rows, cols].copy()
+        image = np.zeros((h, w, 3), dtype=np.uint8)
+        image[mask > 0] = color
+        patches.append((rows, cols, image, mask))
     
-    # Convert to grayscale - this is what the detector processes
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return patches
+
+def create_side_by_side_view(frame, corners, ids, dict_name, all_results=None, gray=None):
+    """Create a side by side view of original frame and grayscale.
     
-    # Convert grayscale back to BGR for visualization
-    gray_bgr = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+    Detections are drawn onto frame in place. Pass the detector's gray image
+    to avoid converting the frame again. The returned view is recycled after
+    SIDE_BY_SIDE_BUFFER_COUNT further calls.
+    """
+    # Get frame dimensions
+    height, width = frame.shape[:2]
     
-    # Create the side-by-side view
-    combined = np.zeros((height, width * 2, 3), dtype=np.uint8)
+    # Grayscale is what the detector processes
+    if gray is None:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    elif isinstance(gray, cv2.UMat):
+        gray = gray.get()
     
-    # Copy original frame with detections to left side
-    frame_with_markers = frame.copy()
+    # Both halves are fully overwritten, so a recycled buffer needs no clearing
+    combined = get_side_by_side_buffer(height, width)
     
+    # Convert grayscale back to BGR straight into the right half for visualization
+    cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR, dst=combined[:, width:])
+    
+    # Draw detections directly onto the frame for the left side
     if all_results:
         # Draw markers from all dictionaries with different colors
         for idx, (dict_name, dict_corners, dict_ids) in enumerate(all_results):
             color = get_debug_color(idx)
             if dict_ids is not None:
-                frame_with_markers = aruco.drawDetectedMarkers(frame_with_markers, dict_corners, dict_ids, color)
+                draw_markers(frame, dict_corners, dict_ids, color)
     elif ids is not None:
-        frame_with_markers = aruco.drawDetectedMarkers(frame_with_markers, corners, ids)
+        draw_markers(frame, corners, ids)
     
-    combined[:, :width] = frame_with_markers
-    combined[:, width:] = gray_bgr
+    np.copyto(combined[:, :width], frame)
     
-    # Add labels
-    cv2.putText(combined, "Original + Detections", (10, 30),
-                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-    cv2.putText(combined, "Grayscale View", (width + 10, 30),
-                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+    # Add the fixed labels and resolution info from pre-rendered patches
+    for rows, cols, image, mask in get_static_labels(width, height):
+        cv2.copyTo(image, mask, combined[rows, cols])
     
     # Add detection info
     y_offset = 70
@@ -249,35 +585,224 @@ def create_side_by_side_view(frame, corners, ids, dict_name, all_results=None):
         for idx, (dict_name, dict_corners, dict_ids) in enumerate(all_results):
             color = get_debug_color(idx)
             if dict_ids is not None and len(dict_ids) > 0:
-                dict_text = f"{dict_name}: {len(dict_ids)} markers - IDs: {', '.join(str(id[0]) for id in dict_ids)}"
+                dict_text = f"{dict_name}: {len(dict_ids)} markers - IDs: {', '.join(map(str, dict_ids.ravel().tolist()))}"
                 cv2.putText(combined, dict_text, (10, y_offset),
                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
                 y_offset += 30
     elif ids is not None:
         cv2.putText(combined, f"{dict_name}: {len(ids)} markers", (10, y_offset),
                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-        id_text = f"IDs: {', '.join(str(id[0]) for id in ids)}"
+        id_text = f"IDs: {', '.join(map(str, ids.ravel().tolist()))}"
         cv2.putText(combined, id_text, (10, y_offset + 40),
                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
     else:
         cv2.putText(combined, f"No markers found", (10, y_offset),
                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
     
-    # Add resolution info to the debug overlay
-    cv2.putText(combined, resolution_text, (10, height - 30),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-    
     # If markers were detected, show their sizes
     if ids is not None and len(corners) > 0:
-        for i, corner in enumerate(corners):
+        for i, (corner, marker_id) in enumerate(zip(corners, ids.ravel().tolist())):
             # Calculate marker perimeter
             perimeter = cv2.arcLength(corner[0], True)
-            size_text = f"Marker {ids[i][0]} size: {int(perimeter)} pixels"
+            size_text = f"Marker {marker_id} size: {int(perimeter)} pixels"
             cv2.putText(combined, size_text, (10, height - (60 + i * 30)),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
     
     return combined
 
+def put_until_stopped(q, item, stop_event):
+    """Put an item on a bounded queue, giving up once stop_event is set."""
+    while not stop_event.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def read_frames(cap, frame_queue, stop_event):
+    """Reader stage: decode frames into frame_queue until the source ends."""
+    while not stop_event.is_set():
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if not put_until_stopped(frame_queue, frame, stop_event):
+            return
+    
+    # Signal end of stream to the next stage
+    put_until_stopped(frame_queue, None, stop_event)
+
+def detect_markers_for_mode(gray, args, detectors, multi_detector, scale=1):
+    """Run detection for the selected mode, returning [(dict_name, corners, ids)].
+    
+    Returned corners are multiplied by scale, for when gray is a downscaled frame.
+    """
+    # Keep the duplicate radius in full resolution pixels
+    min_distance = DUPLICATE_MIN_DISTANCE / scale
+    if args.dict:
+        # Use specified dictionary
+        detections = {args.dict: detect_markers_with_params(gray, detectors[args.dict], min_distance)}
+    elif args.test_all:
+        # Test all dictionaries
+        detections = detect_markers_all_dictionaries(gray, detectors, multi_detector, min_distance)
+    else:
+        # Default: use the first dictionary that detects any marker
+        corners, ids, dict_name, dictionary = find_first_marker(gray, detectors, multi_detector, min_distance)
+        detections = {dict_name: (corners, ids, None)}
+    
+    results = []
+    for dict_name, (corners, ids, rejected) in detections.items():
+        if ids is not None and len(ids) > 0:
+            if scale != 1:
+                corners = [corner * scale for corner in corners]
+            results.append((dict_name, corners, ids))
+    return results
+
+def track_markers(prev_gray, gray, results):
+    """Propagate marker corners from prev_gray into gray with optical flow.
+    
+    Markers that lose any corner are dropped. Returns None when nothing
+    could be tracked, in which case the caller should run full detection.
+    """
+    if not results:
+        return None
+    
+    # Flatten every marker corner into an (N*4, 1, 2) point array
+    points = np.concatenate([np.concatenate(corners).reshape(-1, 2)
+                             for _, corners, _ in results]).astype(np.float32).reshape(-1, 1, 2)
+    new_points, status, _ = cv2.calcOpticalFlowPyrLK(prev_gray, gray, points, None)
+    if isinstance(new_points, cv2.UMat):
+        new_points, status = new_points.get(), status.get()
+    if new_points is None:
+        return None
+    
+    new_points = new_points.reshape(-1, 4, 2)
+    tracked_ok = status.reshape(-1, 4).all(axis=1)
+    
+    tracked = []
+    marker_index = 0
+    for dict_name, corners, ids in results:
+        count = len(corners)
+        marker_ok = tracked_ok[marker_index:marker_index + count]
+        if marker_ok.any():
+            marker_points = new_points[marker_index:marker_index + count][marker_ok]
+            tracked.append((dict_name, list(marker_points.reshape(-1, 1, 4, 2)), ids[marker_ok]))
+        marker_index += count
+    
+    return tracked or None
+
+def scene_changed(reference, thumbnail):
+    """Check whether a gray thumbnail differs visibly from the reference one."""
+    diff = cv2.absdiff(reference, thumbnail)
+    _, changed = cv2.threshold(diff, STATIC_DIFF_THRESHOLD, 255, cv2.THRESH_BINARY)
+    return cv2.countNonZero(changed) > STATIC_MAX_CHANGED_PIXELS
+
+def refine_corners(gray, results):
+    """Refine upscaled marker corners against full resolution gray, in place."""
+    if not results:
+        return results
+    
+    # Refine every corner of every marker in one call
+    points = np.concatenate([np.concatenate(corners).reshape(-1, 2)
+                             for _, corners, _ in results]).astype(np.float32).reshape(-1, 1, 2)
+    points = cv2.cornerSubPix(gray, points, CORNER_REFINE_WINDOW, (-1, -1), CORNER_REFINE_CRITERIA)
+    if isinstance(points, cv2.UMat):
+        points = points.get()
+    
+    refined = []
+    marker_index = 0
+    for dict_name, corners, ids in results:
+        count = len(corners)
+        marker_points = points[marker_index * 4:(marker_index + count) * 4]
+        refined.append((dict_name, list(marker_points.reshape(-1, 1, 4, 2)), ids))
+        marker_index += count
+    
+    return refined
+
+def create_results_view(frame, gray, results, args):
+    """Build the debug view for the results of the selected mode."""
+    if args.test_all:
+        # Create side by side view with all results
+        return create_side_by_side_view(frame, None, None, None, all_results=results, gray=gray)
+    
+    if results:
+        dict_name, corners, ids = results[0]
+        return create_side_by_side_view(frame, corners, ids, dict_name, gray=gray)
+    
+    return create_side_by_side_view(frame, None, None, args.dict, gray=gray)
+
+def detect_frames(frame_queue, view_queue, stop_event, args, detectors, multi_detector,
+                  use_opencl=False):
+    """Detection stage: turn frames from frame_queue into debug views on view_queue.
+    
+    With args.no_draw the detection results are queued instead of debug views.
+    
+    With use_opencl the grayscale images are UMats, so image-wide work runs
+    through OpenCL; drawing still happens on the NumPy frame.
+    """
+    # Grayscale buffers for the current and previous frame, swapped every frame
+    gray = None
+    prev_gray = None
+    reference_thumbnail = None
+    
+    # Reused output buffers for the next thumbnail and the half resolution gray
+    spare_thumbnail = None
+    small_gray = None
+    results = []
+    frame_index = 0
+    
+    try:
+        while not stop_event.is_set():
+            try:
+                frame = frame_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if frame is None:
+                break
+    
+            # Flip frame horizontally if using camera
+            if not args.video:
+                frame = cv2.flip(frame, 1)
+    
+            # Convert to grayscale once; detection runs on gray, drawing on frame
+            prev_gray, gray = gray, prev_gray
+            source = cv2.UMat(frame) if use_opencl else frame
+            gray = cv2.cvtColor(source, cv2.COLOR_BGR2GRAY, dst=gray)
+    
+            # Keep the last results while the scene matches the frame they came from
+            thumbnail = cv2.resize(gray, STATIC_THUMBNAIL_SIZE, dst=spare_thumbnail,
+                                   interpolation=cv2.INTER_LINEAR)
+            spare_thumbnail = thumbnail
+            if reference_thumbnail is None or scene_changed(reference_thumbnail, thumbnail):
+                # The old reference becomes the buffer for the next thumbnail
+                reference_thumbnail, spare_thumbnail = thumbnail, reference_thumbnail
+                
+                # Full detection every few frames; track corners in between
+                tracked = None
+                if frame_index % args.detect_every != 0:
+                    tracked = track_markers(prev_gray, gray, results)
+                if tracked is not None:
+                    results = tracked
+                else:
+                    # Search large frames at half resolution and scale corners back up
+                    if not args.full_res and frame.shape[0] >= PYRAMID_MIN_HEIGHT:
+                        small_gray = cv2.pyrDown(gray, dst=small_gray)
+                        results = detect_markers_for_mode(small_gray, args,
+                                                          detectors, multi_detector, scale=2)
+                        # Recover the accuracy lost to downscaling
+                        results = refine_corners(gray, results)
+                    else:
+                        results = detect_markers_for_mode(gray, args, detectors, multi_detector)
+                frame_index += 1
+    
+            # Without drawing, hand the raw results to the main thread instead
+            output = results if args.no_draw else create_results_view(frame, gray, results, args)
+            if not put_until_stopped(view_queue, output, stop_event):
+                return
+    finally:
+        # Signal end of stream to the display stage
+        put_until_stopped(view_queue, None, stop_event)
+
 def main():
     # Parse command-line arguments
     parser = argparse.ArgumentParser(description='ARuco Marker Detection from Video or Webcam')
@@ -286,32 +811,40 @@ def main():
     input_group.add_argument('--camera', type=int, default=0, help='Camera device index (default: 0)')
     parser.add_argument('--dict', type=str, help='ArUco dictionary to use (e.g., DICT_4X4_50)')
     parser.add_argument('--test-all', action='store_true', help='Test all dictionaries and show all detected markers')
+    parser.add_argument('--full-res', action='store_true',
+                        help='Search for markers at full resolution instead of downscaling large frames')
+    parser.add_argument('--no-opencl', action='store_true',
+                        help='Disable OpenCL acceleration even if it is available')
+    parser.add_argument('--no-draw', '--headless', dest='no_draw', action='store_true',
+                        help='Run detection without drawing or showing the debug view; print a summary at the end')
+    parser.add_argument('--hwaccel', choices=['none', *HWACCEL_OPTIONS], default='none',
+                        help='Hardware video decoding backend for --video files (default: none)')
+    parser.add_argument('--detect-every', type=int, default=3,
+                        help='Run full detection every N frames and track markers in between (default: 3, 1 disables tracking)')
     args = parser.parse_args()
 
-    # Available ArUco dictionaries
-    ARUCO_DICTS = {
-        'DICT_4X4_50': aruco.DICT_4X4_50,
-        'DICT_4X4_100': aruco.DICT_4X4_100,
-        'DICT_4X4_250': aruco.DICT_4X4_250,
-        'DICT_4X4_1000': aruco.DICT_4X4_1000,
-        'DICT_5X5_50': aruco.DICT_5X5_50,
-        'DICT_5X5_100': aruco.DICT_5X5_100,
-        'DICT_5X5_250': aruco.DICT_5X5_250,
-        'DICT_5X5_1000': aruco.DICT_5X5_1000,
-        'DICT_6X6_50': aruco.DICT_6X6_50,
-        'DICT_6X6_100': aruco.DICT_6X6_100,
-        'DICT_6X6_250': aruco.DICT_6X6_250,
-        'DICT_6X6_1000': aruco.DICT_6X6_1000,
-        'DICT_7X7_50': aruco.DICT_7X7_50,
-        'DICT_7X7_100': aruco.DICT_7X7_100,
-        'DICT_7X7_250': aruco.DICT_7X7_250,
-        'DICT_7X7_1000': aruco.DICT_7X7_1000,
-        'DICT_ARUCO_ORIGINAL': aruco.DICT_ARUCO_ORIGINAL,
-    }
+    if args.detect_every < 1:
+        print("Error: --detect-every must be at least 1")
+        sys.exit(1)
+
+    if args.dict and args.dict not in ARUCO_DICTS:
+        print(f"Error: Unknown dictionary {args.dict}")
+        print(f"Available dictionaries: {', '.join(ARUCO_DICTS.keys())}")
+        sys.exit(1)
+
+    # Build detectors once up front instead of on every frame
+    detectors = create_detectors(ARUCO_DICTS)
+    multi_detector = create_multi_dictionary_detector(detectors)
+
+    # Offload image-wide operations to the GPU when OpenCL is available
+    use_opencl = not args.no_opencl and cv2.ocl.haveOpenCL()
+    cv2.ocl.setUseOpenCL(use_opencl)
+    if use_opencl:
+        print("Using OpenCL for image processing")
 
     # Open video capture
     if args.video:
-        cap = cv2.VideoCapture(args.video)
+        cap = open_video(args.video, args.hwaccel)
         if not cap.isOpened():
             print(f"Error: Could not open video file {args.video}")
             sys.exit(1)
@@ -329,47 +862,62 @@ def main():
         cap.set(cv2.CAP_PROP_FPS, 30)
 
     # Create window
-    cv2.namedWindow('ArUco Detector Debug', cv2.WINDOW_NORMAL)
+    if not args.no_draw:
+        cv2.namedWindow('ArUco Detector Debug', cv2.WINDOW_NORMAL)
+
+    # Three-stage pipeline: decode and detection run on worker threads while
+    # the main thread owns the GUI, which HighGUI requires on some platforms
+    frame_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    view_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    stop_event = threading.Event()
+    reader = threading.Thread(target=read_frames,
+                              args=(cap, frame_queue, stop_event), daemon=True)
+    detector_thread = threading.Thread(target=detect_frames,
+                                       args=(frame_queue, view_queue, stop_event,
+                                             args, detectors, multi_detector, use_opencl),
+                                       daemon=True)
+    reader.start()
+    detector_thread.start()
+
+    if args.no_draw:
+        # There is no window to press 'q' in, so Ctrl+C stops the pipeline
+        # and the summary is still printed
+        def handle_interrupt(signum, frame):
+            print("\nStopped by user")
+            stop_event.set()
+        signal.signal(signal.SIGINT, handle_interrupt)
+
+    # Per-dictionary [frames with markers, marker IDs] for --no-draw
+    frame_count = 0
+    found = {}
 
     try:
         while True:
-            ret, frame = cap.read()
-            if not ret:
-                if args.video:  # End of video file
+            try:
+                debug_view = view_queue.get(timeout=0.1)
+            except queue.Empty:
+                if not detector_thread.is_alive():
                     break
-                else:  # Camera error
+                continue
+
+            if debug_view is None:
+                if not args.video:  # Camera error
                     print("Error: Failed to grab frame from camera")
-                    break
+                break
 
-            # Flip frame horizontally if using camera
-            if not args.video:
-                frame = cv2.flip(frame, 1)
+            frame_count += 1
+            if args.no_draw:
+                # Only record what was detected
+                for dict_name, corners, ids in debug_view:
+                    entry = found.setdefault(dict_name, [0, set()])
+                    entry[0] += 1
+                    entry[1].update(ids.ravel().tolist())
+                continue
 
-            if args.dict:
-                # Use specified dictionary
-                if args.dict not in ARUCO_DICTS:
-                    print(f"Error: Unknown dictionary {args.dict}")
-                    print(f"Available dictionaries: {', '.join(ARUCO_DICTS.keys())}")
-                    break
-                
-                # Get predefined dictionary
-                dictionary = cv2.aruco.getPredefinedDictionary(ARUCO_DICTS[args.dict])
-                corners, ids, rejected = detect_markers_with_params(frame, dictionary)
-                
-                # Create side by side view
-                debug_view = create_side_by_side_view(frame, corners, ids, args.dict)
-                
-            elif args.test_all:
-                # Test all dictionaries
-                results = []
-                for dict_name, dict_id in ARUCO_DICTS.items():
-                    dictionary = cv2.aruco.getPredefinedDictionary(dict_id)
-                    corners, ids, rejected = detect_markers_with_params(frame, dictionary)
-                    if ids is not None and len(ids) > 0:
-                        results.append((dict_name, corners, ids))
-                
-                # Create side by side view with all results
-                debug_view = create_side_by_side_view(frame, None, None, None, all_results=results)
+            # When detection outpaces the display, skip the GUI round trip
+            # (and waitKey's forced sleep) for most frames
+            if not view_queue.empty() and frame_count % KEY_POLL_INTERVAL != 0:
+                continue
 
             # Show the combined view
             cv2.imshow('ArUco Detector Debug', debug_view)
@@ -382,9 +930,21 @@ def main():
     except KeyboardInterrupt:
         print("\nStopped by user")
     finally:
+        # Stop the worker threads before releasing the capture
+        stop_event.set()
+        detector_thread.join()
+        reader.join()
+
         # Clean up
         cap.release()
-        cv2.destroyAllWindows()
+        if not args.no_draw:
+            cv2.destroyAllWindows()
+
+    if args.no_draw:
+        print(f"Processed {frame_count} frames")
+        for dict_name, (frames_with_markers, marker_ids) in found.items():
+            print(f"{dict_name}: markers in {frames_with_markers} frames - "
+                  f"IDs: {', '.join(map(str, sorted(marker_ids)))}")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -4,32 +4,177 @@ import numpy as np
 import argparse
 from pathlib import Path
 import json
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-
-def create_debug_window(frame):
-    """Create a debug window with original frame and processed binary image"""
-    height, width = frame.shape[:2]
-    debug_frame = np.zeros((height, width * 2, 3), dtype=np.uint8)
-    # Original frame on the left
-    debug_frame[:, :width] = frame
-    return debug_frame, width
-
-def process_video(video_path, dictionary_name="DICT_6X6_250", show_video=True):
-    """Process video file and detect ArUco markers"""
-    # Get ArUco dictionary
-    ARUCO_DICT = {
-        "DICT_4X4_50": cv2.aruco.DICT_4X4_50,
-        "DICT_4X4_100": cv2.aruco.DICT_4X4_100,
-        "DICT_5X5_50": cv2.aruco.DICT_5X5_50,
-        "DICT_5X5_100": cv2.aruco.DICT_5X5_100,
-        "DICT_6X6_50": cv2.aruco.DICT_6X6_50,
-        "DICT_6X6_100": cv2.aruco.DICT_6X6_100,
-        "DICT_6X6_250": cv2.aruco.DICT_6X6_250,
-        "DICT_7X7_50": cv2.aruco.DICT_7X7_50,
-        "DICT_7X7_100": cv2.aruco.DICT_7X7_100,
-        "DICT_ARUCO_ORIGINAL": cv2.aruco.DICT_ARUCO_ORIGINAL
-    }
-
+from aruco_common import HWACCEL_OPTIONS, download_detections, open_video
+
+try:
+    from numba import njit, prange
+except ImportError:  # Numba is optional; OpenCV's mean adaptive threshold is used instead
+    njit = None
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; frame stats are encoded with the json module instead
+    orjson = None
+
+# Frames queued per worker process in --no-video runs
+POOL_FRAMES_PER_WORKER = 4
+
+# With --track-roi, markers are searched for around the last frame's markers, padded by
+# this fraction of their bounding box, and the whole frame is rescanned every few frames
+TRACK_ROI_MARGIN = 0.5
+TRACK_ROI_MAX_AREA = 0.5
+TRACK_FULL_SCAN_INTERVAL = 30
+
+# Frames between reads of the parameter trackbars
+TRACKBAR_POLL_INTERVAL = 5
+
+# Blur kernels this large run faster as a float separable filter than through GaussianBlur
+SEPARABLE_BLUR_MIN_SIZE = 9
+
+# The debug mosaic is composed at most this wide; wider mosaics are shown downscaled
+DISPLAY_MAX_WIDTH = 1920
+
+# Supported ArUco dictionaries
+ARUCO_DICT = {
+    "DICT_4X4_50": cv2.aruco.DICT_4X4_50,
+    "DICT_4X4_100": cv2.aruco.DICT_4X4_100,
+    "DICT_5X5_50": cv2.aruco.DICT_5X5_50,
+    "DICT_5X5_100": cv2.aruco.DICT_5X5_100,
+    "DICT_6X6_50": cv2.aruco.DICT_6X6_50,
+    "DICT_6X6_100": cv2.aruco.DICT_6X6_100,
+    "DICT_6X6_250": cv2.aruco.DICT_6X6_250,
+    "DICT_7X7_50": cv2.aruco.DICT_7X7_50,
+    "DICT_7X7_100": cv2.aruco.DICT_7X7_100,
+    "DICT_ARUCO_ORIGINAL": cv2.aruco.DICT_ARUCO_ORIGINAL
+}
+
+class FrameReader:
+    """Decode frames on a background thread into two alternating buffers
+
+    Live sources only keep the newest frame; files hand over every frame in order
+    """
+
+    def __init__(self, video, live):
+        self.video = video
+        self.live = live
+        self.buffers = [None, None]
+        self.held = 1  # buffer being processed by the caller
+        self.latest = None  # buffer holding the newest unread frame
+        self.finished = False
+        self.changed = threading.Condition(threading.Lock())
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._read_frames, daemon=True)
+        self.thread.start()
+
+    def _read_frames(self):
+        """Reader thread: decode ahead, then retrieve into the buffer the caller is not holding"""
+        while not self.stop_event.is_set():
+            ret = self.video.grab()
+
+            with self.changed:
+                # Files must not drop frames: wait until the last one was taken
+                while not self.live and self.latest is not None and not self.stop_event.is_set():
+                    self.changed.wait()
+                if ret:
+                    write_index = 1 - self.held
+                    ret, frame = self.video.retrieve(self.buffers[write_index])
+                if ret:
+                    self.buffers[write_index] = frame
+                    self.latest = write_index
+                else:
+                    self.finished = True
+                self.changed.notify_all()
+            if not ret:
+                return
+
+    def read(self):
+        """Return (ret, frame) for the next frame, like VideoCapture.read"""
+        with self.changed:
+            while self.latest is None and not self.finished:
+                self.changed.wait()
+            if self.latest is None:
+                return False, None
+            self.held, self.latest = self.latest, None
+            self.changed.notify_all()
+            return True, self.buffers[self.held]
+
+    def stop(self):
+        """Stop the reader thread so the capture can be released"""
+        self.stop_event.set()
+        with self.changed:
+            self.changed.notify_all()
+        self.thread.join()
+
+def frame_json(frame_stats):
+    """Encode one frame's stats as compact JSON, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(frame_stats).decode()
+    return json.dumps(frame_stats, separators=(",", ":"))
+
+class StatsWriter:
+    """Stream detection statistics to a JSON file one frame at a time"""
+
+    def __init__(self, output_dir):
+        self.output_dir = Path(output_dir)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.output_file = self.output_dir / f"aruco_validation_{timestamp}.json"
+        self.file = None
+        self.frames_written = 0
+
+    def begin(self, video_info):
+        """Open the output file and write everything before the frame list"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.file = open(self.output_file, 'w')
+        self.file.write('{\n  "video_info": ' + json.dumps(video_info) + ',\n  "frames": [')
+
+    def add_frame(self, frame_stats):
+        """Append one frame's stats, one frame per line"""
+        separator = ',\n    ' if self.frames_written else '\n    '
+        self.file.write(separator + frame_json(frame_stats))
+        self.frames_written += 1
+
+    def finish(self, summary):
+        """Close the frame list and write the summary"""
+        self.file.write('\n  ],\n  "summary": ' + json.dumps(summary, indent=2).replace('\n', '\n  ') + '\n}\n')
+        self.close()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def discard(self):
+        """Close and delete the output file of a run that did not finish"""
+        if self.file is not None:
+            self.close()
+            self.output_file.unlink()
+
+def upscale_corners(corners, scale, gray, parameters):
+    """Map marker corners found on a downscaled image back onto full resolution gray"""
+    if len(corners) == 0:
+        return corners
+
+    points = np.concatenate(corners).reshape(-1, 1, 2) * scale
+
+    # Recover the accuracy lost to downscaling with the detector's own refinement settings,
+    # even when refinement is off; scaled up corners are off by whole detection pixels
+    win_size = (parameters.cornerRefinementWinSize, parameters.cornerRefinementWinSize)
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_COUNT,
+                parameters.cornerRefinementMaxIterations,
+                parameters.cornerRefinementMinAccuracy)
+    points = cv2.cornerSubPix(gray, points, win_size, (-1, -1), criteria)
+    if isinstance(points, cv2.UMat):
+        points = points.get()
+
+    return tuple(points.reshape(-1, 1, 4, 2))
+
+def create_detector(dictionary_name, refine=True):
+    """Create the ArUco detector used for validation, returning it with its parameters"""
     if dictionary_name not in ARUCO_DICT:
         raise ValueError(f"ArUco dictionary {dictionary_name} not found")
 
@@ -45,7 +190,11 @@ def process_video(video_path, dictionary_name="DICT_6X6_250", show_video=True):
     parameters.minMarkerPerimeterRate = 0.03
     parameters.maxMarkerPerimeterRate = 0.4
     parameters.polygonalApproxAccuracyRate = 0.03
-    parameters.cornerRefinementMethod = cv2.aruco.CORNER_REFINE_SUBPIX
+    # Subpixel refinement only moves found corners; skip it when exact corners are not needed
+    if refine:
+        parameters.cornerRefinementMethod = cv2.aruco.CORNER_REFINE_SUBPIX
+    else:
+        parameters.cornerRefinementMethod = cv2.aruco.CORNER_REFINE_NONE
     parameters.cornerRefinementWinSize = 5
     parameters.cornerRefinementMaxIterations = 30
     parameters.cornerRefinementMinAccuracy = 0.1
@@ -55,19 +204,252 @@ def process_video(video_path, dictionary_name="DICT_6X6_250", show_video=True):
     parameters.maxErroneousBitsInBorderRate = 0.35
     parameters.errorCorrectionRate = 0.6
 
-    detector = cv2.aruco.ArucoDetector(aruco_dict, parameters)
+    return cv2.aruco.ArucoDetector(aruco_dict, parameters), parameters
+
+def create_image(height, width, channels=1, use_opencl=False):
+    """Allocate a reusable 8-bit image, as a UMat when OpenCL is used"""
+    if use_opencl:
+        return cv2.UMat(height, width, cv2.CV_8UC(channels))
+    shape = (height, width, channels) if channels > 1 else (height, width)
+    return np.empty(shape, dtype=np.uint8)
+
+def detection_scaling(width, height, detect_width=None):
+    """Return (detect_size, corner_scale) for searching frames of this size, or (None, None)
+
+    Frames wider than detect_width are searched at reduced resolution; by default all are searched at full resolution
+    """
+    if detect_width is None or detect_width >= width:
+        return None, None
+
+    detect_scale = detect_width / width
+
+    detect_size = (round(width * detect_scale), round(height * detect_scale))
+    corner_scale = np.array([width / detect_size[0], height / detect_size[1]], dtype=np.float32)
+    return detect_size, corner_scale
+
+def detect_markers(detector, parameters, gray, detect_size=None, corner_scale=None, small_gray=None):
+    """Detect markers in gray, searching a copy resized to detect_size if given
+
+    Corners and rejected candidates are returned at full resolution
+    """
+    if detect_size is None:
+        return download_detections(*detector.detectMarkers(gray))
+
+    small_gray = cv2.resize(gray, detect_size, dst=small_gray, interpolation=cv2.INTER_AREA)
+    corners, ids, rejected = download_detections(*detector.detectMarkers(small_gray))
+    rejected = tuple(candidate * corner_scale for candidate in rejected)
+    return upscale_corners(corners, corner_scale, gray, parameters), ids, rejected
+
+def tracking_roi(corners, width, height):
+    """Return the (x0, y0, x1, y1) box to search the next frame in, or None for a full scan
+
+    The box pads the corners' bounds by TRACK_ROI_MARGIN; boxes covering more than
+    TRACK_ROI_MAX_AREA of the frame are not worth cropping
+    """
+    points = np.concatenate(corners).reshape(-1, 2)
+    (x_min, y_min), (x_max, y_max) = points.min(axis=0), points.max(axis=0)
+    margin_x = (x_max - x_min) * TRACK_ROI_MARGIN
+    margin_y = (y_max - y_min) * TRACK_ROI_MARGIN
+    x0, y0 = max(0, int(x_min - margin_x)), max(0, int(y_min - margin_y))
+    x1, y1 = min(width, int(x_max + margin_x) + 1), min(height, int(y_max + margin_y) + 1)
+    if (x1 - x0) * (y1 - y0) > TRACK_ROI_MAX_AREA * width * height:
+        return None
+    return x0, y0, x1, y1
+
+def detect_markers_in_roi(roi_detector, roi_parameters, parameters, gray, frame_size, roi, detect_size=None):
+    """Detect markers inside the roi = (x0, y0, x1, y1) box of gray, returning frame coordinates
+
+    frame_size is gray's (width, height); the box is searched at the same scale as full frames; roi_detector is a second detector
+    whose perimeter limits are rescaled from parameters to match the box size
+    """
+    x0, y0, x1, y1 = roi
+    crop = cv2.UMat(gray, (y0, y1), (x0, x1)) if isinstance(gray, cv2.UMat) else gray[y0:y1, x0:x1]
+    crop_size = (x1 - x0, y1 - y0)
+
+    crop_detect_size, crop_scale = None, None
+    if detect_size is not None:
+        crop_detect_size = (max(1, round(crop_size[0] * detect_size[0] / frame_size[0])),
+                            max(1, round(crop_size[1] * detect_size[1] / frame_size[1])))
+        crop_scale = np.array([crop_size[0] / crop_detect_size[0], crop_size[1] / crop_detect_size[1]],
+                              dtype=np.float32)
+
+    # ArUco scales the perimeter limits by the image size; keep the full frame's limits in pixels
+    size_ratio = max(frame_size) / max(crop_size)
+    roi_parameters.minMarkerPerimeterRate = parameters.minMarkerPerimeterRate * size_ratio
+    roi_parameters.maxMarkerPerimeterRate = parameters.maxMarkerPerimeterRate * size_ratio
+    roi_detector.setDetectorParameters(roi_parameters)
+
+    corners, ids, rejected = detect_markers(roi_detector, roi_parameters, crop, crop_detect_size, crop_scale)
+    offset = np.array([x0, y0], dtype=np.float32)
+    corners = tuple(corner + offset for corner in corners)
+    rejected = tuple(candidate + offset for candidate in rejected)
+    return corners, ids, rejected
+
+def marker_details(corners, ids):
+    """Convert detected corners and IDs to JSON-ready marker dicts in one pass each"""
+    return [
+        {"id": marker_id, "corners": marker_corners}
+        for marker_id, marker_corners in zip(ids.flatten().tolist(), np.stack(corners).tolist())
+    ]
+
+# Detector, parameters and detection scaling of a pool worker process
+_worker_state = None
+
+def _init_worker(dictionary_name, refine, detect_size, corner_scale):
+    """Pool initializer: build one detector per worker process"""
+    global _worker_state
+    # Frames are already spread over processes; avoid oversubscribing the cores
+    cv2.setNumThreads(1)
+    detector, parameters = create_detector(dictionary_name, refine)
+    _worker_state = (detector, parameters, detect_size, corner_scale)
+
+def _detect_one(gray):
+    """Pool worker: detect markers in one grayscale frame, returning (ids, marker details)"""
+    detector, parameters, detect_size, corner_scale = _worker_state
+    corners, ids, _ = detect_markers(detector, parameters, gray, detect_size, corner_scale)
+    if ids is None:
+        return None, []
+    return ids.reshape(-1).astype(np.int32), marker_details(corners, ids)
+
+def detect_in_pool(reader, dictionary_name, refine, detect_size, corner_scale, workers):
+    """Yield (ids, marker details) for every frame in order, detecting in worker processes"""
+    # Spawn workers so they never inherit the running reader thread
+    context = multiprocessing.get_context("spawn")
+    pending = deque()
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                             initargs=(dictionary_name, refine, detect_size, corner_scale)) as pool:
+        while True:
+            ret, frame = reader.read()
+            if ret:
+                pending.append(pool.submit(_detect_one, cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)))
+            if not pending:
+                return
+
+            # Keep a bounded number of frames in flight, collecting results in order
+            if not ret or len(pending) >= workers * POOL_FRAMES_PER_WORKER:
+                yield pending.popleft().result()
+
+def _mean_threshold_loop(integral, gray, radius, c_value, out):
+    """Set out to 255 where pixel + C exceeds the rounded mean of its neighbourhood, else 0"""
+    height, width = gray.shape
+    for y in prange(height):
+        y0 = max(y - radius, 0)
+        y1 = min(y + radius + 1, height)
+        for x in range(width):
+            x0 = max(x - radius, 0)
+            x1 = min(x + radius + 1, width)
+            block_sum = integral[y1, x1] - integral[y0, x1] - integral[y1, x0] + integral[y0, x0]
+            area = (y1 - y0) * (x1 - x0)
+            # pixel + C > round(block_sum / area), without the division
+            out[y, x] = 255 if (2 * (gray[y, x] + c_value) - 1) * area > 2 * block_sum else 0
+
+if njit is not None:
+    _mean_threshold = njit(parallel=True, fastmath=True, cache=True)(_mean_threshold_loop)
+else:
+    _mean_threshold = None
+
+def create_integral(height, width):
+    """Allocate an integral image buffer for adaptive_mean_threshold, or None without Numba"""
+    if _mean_threshold is None:
+        return None
+    # 32-bit sums are faster and cannot overflow below roughly 8 megapixels
+    dtype = np.int32 if height * width * 255 < 2**31 else np.float64
+    return np.empty((height + 1, width + 1), dtype=dtype)
+
+def adaptive_mean_threshold(gray, block_size, c_value, dst, integral=None):
+    """Binarize gray against the mean of each pixel's block_size neighbourhood, like ArUco does
+
+    The Numba kernel sums blocks from an integral image and never divides by the block area
+    """
+    if integral is None or isinstance(gray, cv2.UMat):
+        return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY,
+                                     block_size, c_value, dst=dst)
+
+    sdepth = cv2.CV_32S if integral.dtype == np.int32 else cv2.CV_64F
+    cv2.integral(gray, integral, sdepth)
+    _mean_threshold(integral, gray, block_size // 2, c_value, dst)
+    return dst
+
+def create_debug_window(frame):
+    """Create a debug window with original frame and processed binary image"""
+    height, width = frame.shape[:2]
+    debug_frame = np.zeros((height, width * 2, 3), dtype=np.uint8)
+    # Original frame on the left
+    debug_frame[:, :width] = frame
+    return debug_frame, width
+
+def _ignore_trackbar(value):
+    """Trackbar callback; positions are polled in the frame loop instead"""
+
+def record_frame(stats, found_ids, writer, frame_number, timestamp, ids, markers):
+    """Add one frame's detections to the summary and stream its stats to writer, or keep them in stats"""
+    if ids is not None:
+        stats["summary"]["frames_with_markers"] += 1
+        stats["summary"]["total_markers_detected"] += len(ids)
+        found_ids.append(ids.reshape(-1).astype(np.int32, copy=False))
+
+    frame_stats = {
+        "frame_number": frame_number,
+        "timestamp": timestamp,
+        "markers_detected": markers
+    }
+    if writer is not None:
+        writer.add_frame(frame_stats)
+    else:
+        stats["frames"].append(frame_stats)
+    stats["summary"]["total_frames"] = frame_number
+
+def finish_stats(stats, found_ids, writer):
+    """Fill in the summary's unique IDs and close writer's output with it"""
+    # Unique IDs as a plain list for JSON serialization
+    if found_ids:
+        stats["summary"]["marker_ids_found"] = np.unique(np.concatenate(found_ids)).tolist()
+    if writer is not None:
+        writer.finish(stats["summary"])
+
+def process_video(video_path, dictionary_name="DICT_6X6_250", show_video=True, detect_width=None,
+                  refine=True, show_rejected=False, workers=1, use_opencl=False, track_roi=False,
+                  display_every=1, hwaccel="none", writer=None):
+    """Process video file and detect ArUco markers
+
+    Per-frame stats are streamed to writer (a StatsWriter) if given, otherwise
+    they are returned in stats["frames"] for save_stats. If the run is stopped
+    with Ctrl+C, writer's output is kept and closed with a summary marked "interrupted".
+
+    With use_opencl the preprocessing images are UMats, so image-wide work runs
+    through OpenCL; the debug mosaic is still composed from NumPy copies.
+    With track_roi frames are searched around the previous frame's markers and
+    processed serially, since each frame then depends on the one before.
+    When showing video, only every display_every-th frame is drawn; all frames are detected.
+    With detect_width frames wider than it are searched downscaled to that width,
+    which is faster but can find fewer markers than the full resolution default.
+    refine=False skips subpixel corner refinement; downscaled detections are refined regardless.
+    hwaccel selects GPU decoding, one of HWACCEL_OPTIONS or "none"
+    """
+    detector, parameters = create_detector(dictionary_name, refine)
+    if track_roi:
+        roi_detector, roi_parameters = create_detector(dictionary_name, refine)
 
     # Open video file
-    video = cv2.VideoCapture(str(video_path))
+    video = open_video(video_path, hwaccel)
     if not video.isOpened():
         raise ValueError(f"Could not open video file: {video_path}")
 
+    # Keep live sources from queueing stale frames while a frame is processed
+    video.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
     # Get video properties
     fps = video.get(cv2.CAP_PROP_FPS)
     frame_count = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
     width = int(video.get(cv2.CAP_PROP_FRAME_WIDTH))
     height = int(video.get(cv2.CAP_PROP_FRAME_HEIGHT))
 
+    # Cameras and streams report no frame count; files are read sequentially
+    live = frame_count <= 0
+
+    # Search at full resolution unless a smaller detect_width is requested
+    detect_size, corner_scale = detection_scaling(width, height, detect_width)
+
     # Statistics
     stats = {
         "video_info": {
@@ -77,150 +459,203 @@ def process_video(video_path, dictionary_name="DICT_6X6_250", show_video=True):
             "width": width,
             "height": height,
             "dictionary": dictionary_name
-        },
-        "frames": [],
-        "summary": {
-            "total_frames": 0,
-            "frames_with_markers": 0,
-            "total_markers_detected": 0,
-            "marker_ids_found": set()
         }
     }
+    if detect_size is not None:
+        # Record the search resolution, since downscaling changes what is found
+        stats["video_info"]["detect_width"] = detect_size[0]
+    if writer is None:
+        stats["frames"] = []
+    stats["summary"] = {
+        "total_frames": 0,
+        "frames_with_markers": 0,
+        "total_markers_detected": 0,
+        "marker_ids_found": []
+    }
 
-    # Create windows for parameter adjustment if showing video
-    if show_video:
-        cv2.namedWindow('Parameters')
-        cv2.createTrackbar('Contrast', 'Parameters', 100, 200, lambda x: None)
-        cv2.createTrackbar('Brightness', 'Parameters', 100, 200, lambda x: None)
-        cv2.createTrackbar('Blur', 'Parameters', 0, 20, lambda x: None)
-        cv2.createTrackbar('Block Size', 'Parameters', 11, 99, lambda x: None)
-        cv2.createTrackbar('C', 'Parameters', 2, 20, lambda x: None)
-
-    frame_number = 0
-    while True:
-        ret, frame = video.read()
-        if not ret:
-            break
-
-        frame_number += 1
-        frame_stats = {
-            "frame_number": frame_number,
-            "timestamp": frame_number / fps,
-            "markers_detected": []
-        }
+    # IDs detected in each frame, reduced to the unique set once the video ends
+    found_ids = []
+
+    if writer is not None:
+        writer.begin(stats["video_info"])
 
-        # Get parameters from trackbars if showing video
+    reader = None
+    try:
+        # Create windows for parameter adjustment if showing video
+        if show_video:
+            cv2.namedWindow('Parameters', cv2.WINDOW_AUTOSIZE)
+            cv2.createTrackbar('Contrast', 'Parameters', 100, 200, _ignore_trackbar)
+            cv2.createTrackbar('Brightness', 'Parameters', 100, 200, _ignore_trackbar)
+            cv2.createTrackbar('Blur', 'Parameters', 0, 20, _ignore_trackbar)
+            cv2.createTrackbar('Block Size', 'Parameters', 11, 99, _ignore_trackbar)
+            cv2.createTrackbar('C', 'Parameters', 2, 20, _ignore_trackbar)
+
+        # Working images, reused for every frame
+        converted = create_image(height, width, 1, use_opencl)
+        blurred = create_image(height, width, 1, use_opencl)
+        small_gray = None
+        if detect_size is not None:
+            small_gray = create_image(detect_size[1], detect_size[0], 1, use_opencl)
         if show_video:
-            contrast = cv2.getTrackbarPos('Contrast', 'Parameters') / 100.0
-            brightness = cv2.getTrackbarPos('Brightness', 'Parameters') - 100
-            blur_size = cv2.getTrackbarPos('Blur', 'Parameters') * 2 + 1
-            block_size = cv2.getTrackbarPos('Block Size', 'Parameters') * 2 + 1
-            c_value = cv2.getTrackbarPos('C', 'Parameters')
+            binary = create_image(height, width, 1, use_opencl)
+            integral = None if use_opencl else create_integral(height, width)
+            # Compose the mosaic at display size rather than shrinking a full size one
+            display_scale = min(1.0, DISPLAY_MAX_WIDTH / (width * 3))
+            panel_size = (round(width * display_scale), round(height * display_scale))
+            panel_width = panel_size[0]
+            debug_frame = np.empty((panel_size[1], panel_width * 3, 3), dtype=np.uint8)
+            panel_gray = None
+            if display_scale < 1.0:
+                panel_gray = np.empty((panel_size[1], panel_width), dtype=np.uint8)
+
+        # Decode the next frame while the current one is being processed
+        reader = FrameReader(video, live)
+
+        # Without display, frames are independent and can be detected in parallel
+        frame_number = 0
+        roi, roi_markers = None, 0
+        if not show_video and workers > 1 and not track_roi:
+            for ids, markers in detect_in_pool(reader, dictionary_name, refine, detect_size, corner_scale, workers):
+                frame_number += 1
+                record_frame(stats, found_ids, writer, frame_number, frame_number / fps, ids, markers)
         else:
+            # Preprocessing parameters, the trackbar defaults unless showing video
             contrast, brightness = 1.0, 0
             blur_size, block_size, c_value = 1, 11, 2
 
-        # Image preprocessing
-        # 1. Adjust contrast and brightness
-        processed = cv2.convertScaleAbs(frame, alpha=contrast, beta=brightness)
-        
-        # 2. Convert to grayscale
-        gray = cv2.cvtColor(processed, cv2.COLOR_BGR2GRAY)
-        
-        # 3. Apply Gaussian blur if blur_size > 1
-        if blur_size > 1:
-            gray = cv2.GaussianBlur(gray, (blur_size, blur_size), 0)
-        
-        # 4. Apply adaptive thresholding
-        binary = cv2.adaptiveThreshold(
-            gray,
-            255,
-            cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-            cv2.THRESH_BINARY,
-            block_size,
-            c_value
-        )
-
-        # Create debug visualization
-        debug_frame = np.zeros((height, width * 3, 3), dtype=np.uint8)
-        debug_frame[:, :width] = frame  # Original
-        debug_frame[:, width:width*2] = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)  # Grayscale
-        debug_frame[:, width*2:] = cv2.cvtColor(binary, cv2.COLOR_GRAY2BGR)  # Binary
-
-        # Detect markers
-        corners, ids, rejected = detector.detectMarkers(gray)
-
-        # Process detection results
-        if ids is not None:
-            stats["summary"]["frames_with_markers"] += 1
-            stats["summary"]["total_markers_detected"] += len(ids)
-            stats["summary"]["marker_ids_found"].update([int(id_) for id_ in ids.flatten()])
-
-            # Draw detection results on all views
-            for i in range(3):
-                cv2.aruco.drawDetectedMarkers(
-                    debug_frame[:, i*width:(i+1)*width],
-                    corners,
-                    ids,
-                    (0, 255, 0)
-                )
-
-            # Store marker details
-            for i, (marker_corners, marker_id) in enumerate(zip(corners, ids.flatten())):
-                frame_stats["markers_detected"].append({
-                    "id": int(marker_id),
-                    "corners": marker_corners.tolist()
-                })
-
-        # Draw rejected candidates if any
-        if rejected is not None and len(rejected) > 0:
-            for i in range(3):
-                cv2.aruco.drawDetectedMarkers(
-                    debug_frame[:, i*width:(i+1)*width],
-                    rejected,
-                    None,
-                    (0, 0, 255)
-                )
-
-        # Add frame stats
-        stats["frames"].append(frame_stats)
-        stats["summary"]["total_frames"] = frame_number
-
-        # Show debug visualization
+            # Gaussian kernel for large blurs, rebuilt only when the Blur trackbar moves
+            blur_kernel, blur_kernel_size = None, 0
+
+            while True:
+                ret, frame = reader.read()
+                if not ret:
+                    break
+
+                frame_number += 1
+
+                # Get parameters from trackbars every few frames if showing video
+                if show_video and (frame_number - 1) % TRACKBAR_POLL_INTERVAL == 0:
+                    contrast = cv2.getTrackbarPos('Contrast', 'Parameters') / 100.0
+                    brightness = cv2.getTrackbarPos('Brightness', 'Parameters') - 100
+                    blur_size = cv2.getTrackbarPos('Blur', 'Parameters') * 2 + 1
+                    block_size = cv2.getTrackbarPos('Block Size', 'Parameters') * 2 + 1
+                    c_value = cv2.getTrackbarPos('C', 'Parameters')
+
+                # Image preprocessing
+                # 1. Convert to grayscale
+                source = cv2.UMat(frame) if use_opencl else frame
+                gray = cv2.cvtColor(source, cv2.COLOR_BGR2GRAY, dst=converted)
+                
+                # 2. Adjust contrast and brightness on the single gray channel; the defaults leave it unchanged
+                if contrast != 1.0 or brightness != 0:
+                    gray = cv2.convertScaleAbs(gray, dst=gray, alpha=contrast, beta=brightness)
+                
+                # 3. Apply Gaussian blur if blur_size > 1
+                if blur_size >= SEPARABLE_BLUR_MIN_SIZE:
+                    if blur_size != blur_kernel_size:
+                        blur_kernel, blur_kernel_size = cv2.getGaussianKernel(blur_size, 0), blur_size
+                    gray = cv2.sepFilter2D(gray, -1, blur_kernel, blur_kernel, dst=blurred)
+                elif blur_size > 1:
+                    gray = cv2.GaussianBlur(gray, (blur_size, blur_size), 0, dst=blurred)
+                
+                # Detect markers, only around the last frame's markers while tracking;
+                # fall back to the whole frame when any of them is lost
+                ids = None
+                if roi is not None and frame_number % TRACK_FULL_SCAN_INTERVAL != 0:
+                    corners, ids, rejected = detect_markers_in_roi(roi_detector, roi_parameters, parameters,
+                                                                   gray, (width, height), roi, detect_size)
+                    if ids is not None and len(ids) < roi_markers:
+                        ids = None
+                if ids is None:
+                    corners, ids, rejected = detect_markers(detector, parameters, gray, detect_size,
+                                                            corner_scale, small_gray)
+                if track_roi:
+                    roi = tracking_roi(corners, width, height) if ids is not None else None
+                    roi_markers = len(ids) if ids is not None else 0
+
+                # Add frame stats
+                markers = marker_details(corners, ids) if ids is not None else []
+                record_frame(stats, found_ids, writer, frame_number, frame_number / fps, ids, markers)
+
+                # Show debug visualization; the binary image and mosaic are display-only
+                if show_video and (frame_number - 1) % display_every == 0:
+                    # 4. Apply adaptive thresholding
+                    binary = adaptive_mean_threshold(gray, block_size, c_value, binary, integral)
+
+                    # Create debug visualization; every panel is overwritten each frame
+                    gray_image = gray.get() if use_opencl else gray
+                    binary_image = binary.get() if use_opencl else binary
+                    if panel_gray is None:
+                        np.copyto(debug_frame[:, :width], frame)  # Original
+                        cv2.cvtColor(gray_image, cv2.COLOR_GRAY2BGR, dst=debug_frame[:, width:width*2])  # Grayscale
+                        cv2.cvtColor(binary_image, cv2.COLOR_GRAY2BGR, dst=debug_frame[:, width*2:])  # Binary
+                    else:
+                        cv2.resize(frame, panel_size, dst=debug_frame[:, :panel_width],
+                                   interpolation=cv2.INTER_AREA)
+                        for i, image in ((1, gray_image), (2, binary_image)):
+                            cv2.resize(image, panel_size, dst=panel_gray, interpolation=cv2.INTER_AREA)
+                            cv2.cvtColor(panel_gray, cv2.COLOR_GRAY2BGR,
+                                         dst=debug_frame[:, i*panel_width:(i+1)*panel_width])
+
+                    # Draw detection results, and rejected candidates if requested, on all views
+                    draw_rejected = show_rejected and rejected is not None and len(rejected) > 0
+                    if ids is not None or draw_rejected:
+                        drawn_corners, drawn_rejected = corners, rejected
+                        if panel_gray is not None:
+                            drawn_corners = tuple(corner * display_scale for corner in corners)
+                            drawn_rejected = tuple(candidate * display_scale for candidate in rejected)
+                        for i in range(3):
+                            panel = debug_frame[:, i*panel_width:(i+1)*panel_width]
+                            if ids is not None:
+                                cv2.aruco.drawDetectedMarkers(panel, drawn_corners, ids, (0, 255, 0))
+                            if draw_rejected:
+                                cv2.aruco.drawDetectedMarkers(panel, drawn_rejected, None, (0, 0, 255))
+
+                    # Add text overlay
+                    cv2.putText(debug_frame, "Original", (10, 30),
+                               cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+                    cv2.putText(debug_frame, "Grayscale", (panel_width + 10, 30),
+                               cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+                    cv2.putText(debug_frame, "Binary", (panel_width*2 + 10, 30),
+                               cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+                    
+                    cv2.putText(debug_frame, f"Frame: {frame_number}/{frame_count}", (10, 70),
+                               cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+                    cv2.putText(debug_frame, f"Markers: {len(ids) if ids is not None else 0}", (10, 110),
+                               cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+                    if rejected is not None:
+                        cv2.putText(debug_frame, f"Rejected: {len(rejected)}", (10, 150),
+                                   cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+
+                    cv2.imshow("ArUco Validation", debug_frame)
+                    key = cv2.waitKey(1) & 0xFF
+                    if key == ord('q'):
+                        break
+
+        finish_stats(stats, found_ids, writer)
+    except KeyboardInterrupt:
+        # Keep the frames processed so far as a valid, partial result
+        stats["summary"]["interrupted"] = True
+        if writer is not None and writer.file is not None:
+            finish_stats(stats, found_ids, writer)
+        raise
+    except BaseException:
+        # Leave no truncated output behind
+        if writer is not None:
+            writer.discard()
+        raise
+    finally:
+        # Clean up, also when a frame fails
+        if reader is not None:
+            reader.stop()
+        video.release()
         if show_video:
-            # Add text overlay
-            cv2.putText(debug_frame, "Original", (10, 30),
-                       cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            cv2.putText(debug_frame, "Grayscale", (width + 10, 30),
-                       cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            cv2.putText(debug_frame, "Binary", (width*2 + 10, 30),
-                       cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            
-            cv2.putText(debug_frame, f"Frame: {frame_number}/{frame_count}", (10, 70),
-                       cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            cv2.putText(debug_frame, f"Markers: {len(ids) if ids is not None else 0}", (10, 110),
-                       cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            if rejected is not None:
-                cv2.putText(debug_frame, f"Rejected: {len(rejected)}", (10, 150),
-                           cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-
-            cv2.imshow("ArUco Validation", debug_frame)
-            key = cv2.waitKey(1) & 0xFF
-            if key == ord('q'):
-                break
-
-    # Clean up
-    video.release()
-    if show_video:
-        cv2.destroyAllWindows()
-
-    # Convert set to list for JSON serialization
-    stats["summary"]["marker_ids_found"] = list(stats["summary"]["marker_ids_found"])
+            cv2.destroyAllWindows()
 
     return stats
 
 def save_stats(stats, output_dir):
-    """Save detection statistics to a JSON file"""
+    """Save detection statistics returned by process_video without a writer to a JSON file"""
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
 
@@ -230,6 +665,10 @@ def save_stats(stats, output_dir):
     with open(output_file, 'w') as f:
         json.dump(stats, f, indent=2)
 
+    print_summary(stats, output_file)
+
+def print_summary(stats, output_file):
+    """Print the detection summary"""
     print(f"Statistics saved to: {output_file}")
     
     # Print summary
@@ -246,17 +685,59 @@ def main():
                       help="ArUco dictionary to use (default: DICT_6X6_250)")
     parser.add_argument("--no-video", action="store_true",
                       help="Don't show video playback")
+    parser.add_argument("--detect-width", type=int, metavar="N",
+                      help="Search frames wider than N pixels downscaled to N pixels wide; faster, "
+                           "but may find fewer markers (default: full resolution)")
+    parser.add_argument("--no-refine", action="store_true",
+                      help="Skip subpixel corner refinement at full resolution for faster runs; "
+                           "corners found with --detect-width are always refined")
+    parser.add_argument("--show-rejected", action="store_true",
+                      help="Draw rejected marker candidates in the debug view")
+    parser.add_argument("--workers", type=int, default=1,
+                      help="Worker processes for detection with --no-video, unless --track-roi "
+                           "(default: 1, detect serially)")
+    parser.add_argument("--track-roi", action="store_true",
+                      help=f"Search each frame only around the previous frame's markers, "
+                           f"rescanning the whole frame every {TRACK_FULL_SCAN_INTERVAL} frames")
+    parser.add_argument("--display-every", type=int, default=1,
+                      help="Draw the debug view every N frames; all frames are still detected (default: 1)")
+    parser.add_argument("--hwaccel", choices=["none", *HWACCEL_OPTIONS], default="none",
+                      help="Decode the video on the GPU through FFmpeg, falling back to software (default: none)")
+    parser.add_argument("--no-opencl", action="store_true",
+                      help="Keep image processing on the CPU even when OpenCL is available")
     parser.add_argument("--output-dir", default="validation_results",
                       help="Directory to save results (default: validation_results)")
 
     args = parser.parse_args()
 
+    if args.display_every < 1:
+        print("Error: --display-every must be at least 1")
+        return 1
+    if args.detect_width is not None and args.detect_width < 1:
+        print("Error: --detect-width must be at least 1")
+        return 1
+
+    # Offload image-wide operations to the GPU when OpenCL is available
+    use_opencl = not args.no_opencl and cv2.ocl.haveOpenCL()
+    cv2.ocl.setUseOpenCL(use_opencl)
+    if use_opencl:
+        print("Using OpenCL for image processing")
+
+    writer = StatsWriter(args.output_dir)
     try:
-        stats = process_video(args.video_path, args.dictionary, not args.no_video)
-        save_stats(stats, args.output_dir)
+        stats = process_video(args.video_path, args.dictionary, not args.no_video, args.detect_width,
+                              not args.no_refine, args.show_rejected, args.workers,
+                              use_opencl, args.track_roi, args.display_every, args.hwaccel, writer=writer)
+        print_summary(stats, writer.output_file)
+    except KeyboardInterrupt:
+        if writer.output_file.exists():
+            print(f"\nInterrupted; partial statistics saved to: {writer.output_file}")
+        return 130
     except Exception as e:
         print(f"Error: {e}")
         return 1
+    finally:
+        writer.close()
 
     return 0
 
@@ -0,0 +1,153 @@
+"""Regression checks against the original duplicate filter and per-dictionary detection."""
+import unittest
+from pathlib import Path
+
+import cv2
+import numpy as np
+from cv2 import aruco
+
+import aruco_detector as ad
+
+VIDEO_PATH = Path(__file__).with_name('aruco3.mp4')
+
+def synthetic_frame():
+    """Render markers from several dictionaries, including ids only the larger ones contain."""
+    frame = np.full((720, 1280), 255, dtype=np.uint8)
+    markers = [
+        ('DICT_4X4_50', 3), ('DICT_4X4_1000', 700), ('DICT_5X5_100', 7),
+        ('DICT_6X6_250', 20), ('DICT_7X7_50', 11), ('DICT_ARUCO_ORIGINAL', 900),
+    ]
+    for index, (dict_name, marker_id) in enumerate(markers):
+        dictionary = aruco.getPredefinedDictionary(ad.ARUCO_DICTS[dict_name])
+        x, y = 60 + (index % 3) * 420, 80 + (index // 3) * 340
+        frame[y:y + 160, x:x + 160] = aruco.generateImageMarker(dictionary, marker_id, 160)
+    return frame
+
+def video_frames(step=35):
+    """Sample every step-th frame of the bundled test video as grayscale."""
+    video = cv2.VideoCapture(str(VIDEO_PATH))
+    frames = []
+    index = 0
+    while video.grab():
+        if index % step == 0:
+            _, frame = video.retrieve()
+            frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+        index += 1
+    video.release()
+    return frames
+
+def baseline_filter_duplicates(corners, ids, min_distance=10):
+    """The original pairwise filter_duplicate_detections, kept as the reference."""
+    if ids is None or len(ids) == 0:
+        return corners, ids
+    centers = np.array([np.mean(corner[0], axis=0) for corner in corners])
+    keep = np.ones(len(ids), dtype=bool)
+    for i in range(len(ids)):
+        if not keep[i]:
+            continue
+        for j in range(i + 1, len(ids)):
+            if not keep[j]:
+                continue
+            if np.linalg.norm(centers[i] - centers[j]) < min_distance:
+                if cv2.arcLength(corners[i][0], True) > cv2.arcLength(corners[j][0], True):
+                    keep[j] = False
+                else:
+                    keep[i] = False
+                    break
+    return [corners[i] for i in range(len(corners)) if keep[i]], ids[keep]
+
+def square(center_x, center_y, perimeter):
+    """A (1, 4, 2) axis-aligned marker quad with the given center and perimeter."""
+    half = perimeter / 8
+    return np.array([[[center_x - half, center_y - half], [center_x + half, center_y - half],
+                      [center_x + half, center_y + half], [center_x - half, center_y + half]]],
+                    dtype=np.float32)
+
+def as_markers(corners, ids):
+    """Map marker id to its corners for an order-independent comparison."""
+    if ids is None:
+        return {}
+    return {marker_id: corner.reshape(4, 2) for marker_id, corner in zip(ids.ravel().tolist(), corners)}
+
+class DuplicateFilterTest(unittest.TestCase):
+    resolvers = {
+        'numpy': ad._resolve_duplicates_numpy,
+        'grid': ad._resolve_duplicates_grid,
+        'loop': ad._resolve_duplicates_loop,
+        'default': ad._resolve_duplicates,
+    }
+
+    def filter_with(self, resolver, corners, ids, min_distance):
+        original = ad._resolve_duplicates
+        ad._resolve_duplicates = resolver
+        try:
+            return ad.filter_duplicate_detections(corners, ids, min_distance)
+        finally:
+            ad._resolve_duplicates = original
+
+    def test_chain_resolves_in_index_order(self):
+        # Each quad is close to the next but the outer two are not close to each other;
+        # the original loop lets the middle one knock out the first before it is dropped
+        corners = [square(100, 100, 10), square(115, 100, 20), square(130, 100, 30)]
+        ids = np.array([[1], [2], [3]], dtype=np.int32)
+        for name, resolver in self.resolvers.items():
+            _, kept = self.filter_with(resolver, corners, ids, 20)
+            self.assertEqual(kept.ravel().tolist(), [3], name)
+
+    def test_matches_original_filter(self):
+        rng = np.random.default_rng(7)
+        for count in (2, 10, 40, ad.DUPLICATE_GRID_MIN_COUNT + 30):
+            for _ in range(20):
+                centers = rng.uniform(0, 200, size=(count, 2))
+                perimeters = rng.uniform(20, 120, size=count)
+                corners = [square(x, y, perimeter) for (x, y), perimeter in zip(centers, perimeters)]
+                ids = np.arange(count, dtype=np.int32).reshape(-1, 1)
+                _, expected = baseline_filter_duplicates(corners, ids, 20)
+                for name, resolver in self.resolvers.items():
+                    _, kept = self.filter_with(resolver, corners, ids, 20)
+                    self.assertEqual(kept.ravel().tolist(), expected.ravel().tolist(), (name, count))
+
+class AllDictionariesTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.detectors = ad.create_detectors(ad.ARUCO_DICTS)
+        cls.multi_detector = ad.create_multi_dictionary_detector(cls.detectors)
+
+    def assert_matches_per_dictionary(self, gray, multi_detector):
+        detections = ad.detect_markers_all_dictionaries(gray, self.detectors, multi_detector)
+        for dict_name, detector in self.detectors.items():
+            # Reference: a plain detectMarkers pass and the original duplicate filter
+            corners, ids, _ = detector.detectMarkers(gray)
+            expected = as_markers(*baseline_filter_duplicates(corners, ids, 20))
+            actual = as_markers(*detections[dict_name][:2])
+            self.assertEqual(actual.keys(), expected.keys(), dict_name)
+            for marker_id, corners in expected.items():
+                np.testing.assert_allclose(actual[marker_id], corners, atol=1e-3, err_msg=dict_name)
+
+    def test_synthetic_frame_finds_every_marker(self):
+        detections = ad.detect_markers_all_dictionaries(synthetic_frame(), self.detectors)
+        self.assertIn(700, detections['DICT_4X4_1000'][1].ravel().tolist())
+        self.assertIn(20, detections['DICT_6X6_250'][1].ravel().tolist())
+
+    def test_synthetic_frame_matches_per_dictionary(self):
+        self.assert_matches_per_dictionary(synthetic_frame(), None)
+
+    @unittest.skipUnless(hasattr(aruco.ArucoDetector, 'detectMarkersMultiDict'),
+                         'OpenCV has no multi-dictionary detection')
+    def test_synthetic_frame_matches_per_dictionary_fused(self):
+        self.assert_matches_per_dictionary(synthetic_frame(), self.multi_detector)
+
+    @unittest.skipUnless(VIDEO_PATH.exists(), 'aruco3.mp4 not available')
+    def test_video_frames_match_per_dictionary(self):
+        for gray in video_frames():
+            self.assert_matches_per_dictionary(gray, None)
+
+    @unittest.skipUnless(VIDEO_PATH.exists(), 'aruco3.mp4 not available')
+    @unittest.skipUnless(hasattr(aruco.ArucoDetector, 'detectMarkersMultiDict'),
+                         'OpenCV has no multi-dictionary detection')
+    def test_video_frames_match_per_dictionary_fused(self):
+        for gray in video_frames():
+            self.assert_matches_per_dictionary(gray, self.multi_detector)
+
+if __name__ == '__main__':
+    unittest.main()